@@ -0,0 +1,554 @@
+# backtester/distributed_sweep.py
+"""
+Distributed parameter sweeps over a SQLite work queue.
+
+Local workers share the queue file directly. Remote workers reach it through
+`serve` over TCP, authenticated with a shared authkey (--authkey or the
+ALGO_TRADER_BROKER_AUTHKEY env var). The broker unpickles what clients send,
+so anyone holding the authkey can run code on the broker host: never expose
+the broker port to untrusted networks.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import hashlib
+import tempfile
+import argparse
+import itertools
+import multiprocessing
+from multiprocessing.managers import BaseManager
+
+import pandas as pd
+
+# ✅ Allow relative imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.data_handler import fetch_ohlcv, clean_and_prepare_data
+from backtester.backtest import backtest_strategy
+from utils.analytics import calculate_performance_metrics
+
+DB_PATH = "data/sweep_queue.db"
+BROKER_PORT = 50505
+BROKER_HOST = "127.0.0.1"
+AUTHKEY_ENV = "ALGO_TRADER_BROKER_AUTHKEY"
+CHUNK_SIZE = 25           # param combinations per job
+LEASE_SECONDS = 300       # a claimed job is re-queued if not finished in time
+MAX_ATTEMPTS = 3
+POLL_INTERVAL = 2         # seconds an idle worker waits before asking again
+
+
+def _strategy_registry():
+    """
+    Strategy name → (signal generator, crossover remap). Imported lazily
+    so the broker process does not need the strategy modules.
+
+    backtest_strategy only acts on crossover == ±1, while the EMA and MACD
+    generators mark entries/exits with ±2, so those are remapped to ±1.
+    """
+    from strategies.ema_crossover import generate_ema_signals
+    from strategies.ema_rsi_strategy import generate_ema_rsi_signals
+    from strategies.macd_strategy import generate_macd_signals
+
+    to_unit = {2: 1, -2: -1}
+    return {
+        "ema": (generate_ema_signals, to_unit),
+        "ema_rsi": (generate_ema_rsi_signals, None),
+        "macd": (generate_macd_signals, to_unit),
+    }
+
+
+def _hash_key(*parts):
+    """
+    Stable id for a job / result, used for deduplication.
+    """
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def expand_param_grid(param_grid):
+    """
+    Turn {"fast_window": [5, 8], "slow_window": [20]} into a list of
+    parameter dicts, one per combination.
+    """
+    if not param_grid:
+        return [{}]
+    keys = sorted(param_grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(param_grid[k] for k in keys))]
+
+
+# ----------------------------
+# 🗃️ SQLite Work-Queue Broker
+# ----------------------------
+class SweepBroker:
+    """
+    Work queue backed by a single SQLite file.
+
+    Every call opens its own connection, so one instance can be shared by
+    local worker processes (same file) or served over TCP with serve_broker().
+    Jobs are leased: a job claimed by a worker that dies is handed out again
+    once its lease expires, up to MAX_ATTEMPTS times. Jobs and results are
+    keyed by content hashes, so re-publishing a sweep or a worker finishing
+    a job twice never produces duplicate rows.
+    """
+
+    def __init__(self, db_path=DB_PATH, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    strategy TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    lease_expires REAL,
+                    error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+                CREATE TABLE IF NOT EXISTS results (
+                    result_id TEXT PRIMARY KEY,
+                    seq INTEGER,
+                    job_id TEXT NOT NULL,
+                    strategy TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    final_balance REAL,
+                    metrics TEXT NOT NULL,
+                    worker TEXT,
+                    finished_at REAL
+                );
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def publish(self, strategies, param_grids, symbols, chunk_size=CHUNK_SIZE):
+        """
+        Split strategy × params × symbol into chunks and enqueue them.
+        param_grids: {strategy_name: {param: [values, ...]}}
+        Returns the number of newly queued jobs (duplicates are skipped).
+        """
+        rows = []
+        for strategy in strategies:
+            combos = expand_param_grid(param_grids.get(strategy, {}))
+            for symbol in symbols:
+                for start in range(0, len(combos), chunk_size):
+                    chunk = combos[start:start + chunk_size]
+                    job_id = _hash_key(strategy, symbol, chunk)
+                    rows.append((job_id, strategy, symbol, json.dumps(chunk)))
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (job_id, strategy, symbol, params) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            queued = conn.total_changes - before
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return queued
+
+    def claim(self, worker_id):
+        """
+        Lease the next runnable job to worker_id, or return None if the
+        queue has nothing to hand out right now.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Expired leases that used up every attempt are given up on
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = COALESCE(error, 'lease expired') "
+                "WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT job_id, strategy, symbol, params, attempts FROM jobs "
+                "WHERE status = 'pending' OR (status = 'running' AND lease_expires < ?) "
+                "ORDER BY rowid LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, lease_expires = ? "
+                "WHERE job_id = ?",
+                (worker_id, now + self.lease_seconds, row["job_id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return {
+            "job_id": row["job_id"],
+            "strategy": row["strategy"],
+            "symbol": row["symbol"],
+            "params": json.loads(row["params"]),
+            "attempt": row["attempts"] + 1,
+        }
+
+    def complete(self, job_id, worker_id, results):
+        """
+        Store a finished job's results and mark it done.
+        results: list of {"params", "final_balance", "metrics"} dicts.
+        Only the worker currently holding the lease can complete a job;
+        returns False (storing nothing) if the lease was lost.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            job = conn.execute(
+                "SELECT strategy, symbol FROM jobs WHERE job_id = ? AND status = 'running' AND worker = ?",
+                (job_id, worker_id),
+            ).fetchone()
+            if job is None:
+                conn.execute("COMMIT")
+                return False
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM results").fetchone()[0]
+            now = time.time()
+            for res in results:
+                seq += 1
+                conn.execute(
+                    "INSERT OR IGNORE INTO results "
+                    "(result_id, seq, job_id, strategy, symbol, params, final_balance, metrics, worker, finished_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        _hash_key(job["strategy"], job["symbol"], res["params"]),
+                        seq,
+                        job_id,
+                        job["strategy"],
+                        job["symbol"],
+                        json.dumps(res["params"], sort_keys=True),
+                        res["final_balance"],
+                        json.dumps(res["metrics"]),
+                        worker_id,
+                        now,
+                    ),
+                )
+            conn.execute(
+                "UPDATE jobs SET status = 'done', lease_expires = NULL, error = NULL "
+                "WHERE job_id = ? AND status = 'running' AND worker = ?",
+                (job_id, worker_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return True
+
+    def fail(self, job_id, worker_id, error):
+        """
+        Report a failed job: re-queue it, or mark it failed after MAX_ATTEMPTS.
+        Ignored if the job has since been leased to a different worker.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease_expires = NULL, error = ? "
+                "WHERE job_id = ? AND status = 'running' AND worker = ?",
+                (self.max_attempts, str(error)[:500], job_id, worker_id),
+            )
+
+    def status(self):
+        """
+        Job counts per status, e.g. {"pending": 10, "running": 2, "done": 40}.
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def is_finished(self):
+        counts = self.status()
+        return counts.get("pending", 0) == 0 and counts.get("running", 0) == 0
+
+    def fetch_results(self, after_seq=0, limit=None):
+        """
+        Results in arrival order with seq > after_seq, so callers can stream
+        them by passing the last seq they have seen.
+        """
+        query = "SELECT * FROM results WHERE seq > ? ORDER BY seq"
+        args = [after_seq]
+        if limit:
+            query += " LIMIT ?"
+            args.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, args).fetchall()
+        return [
+            {
+                "seq": row["seq"],
+                "strategy": row["strategy"],
+                "symbol": row["symbol"],
+                "params": json.loads(row["params"]),
+                "final_balance": row["final_balance"],
+                "metrics": json.loads(row["metrics"]),
+                "worker": row["worker"],
+            }
+            for row in rows
+        ]
+
+
+def results_to_dataframe(results):
+    """
+    Flatten fetch_results() output into one row per backtest.
+    """
+    rows = []
+    for res in results:
+        row = {"strategy": res["strategy"], "symbol": res["symbol"], "final_balance": res["final_balance"]}
+        row.update({f"param_{k}": v for k, v in res["params"].items()})
+        row.update(res["metrics"])
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+# ----------------------------
+# 🌐 TCP Access For Remote Workers
+# ----------------------------
+class _BrokerManager(BaseManager):
+    pass
+
+
+def resolve_authkey(authkey=None):
+    """
+    Broker authkey from the argument or the ALGO_TRADER_BROKER_AUTHKEY env var.
+    There is deliberately no default: a known key lets anyone run code on the broker.
+    """
+    authkey = authkey or os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        raise ValueError(f"❌ Broker authkey required: pass --authkey or set {AUTHKEY_ENV}.")
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+
+def serve_broker(db_path=DB_PATH, host=BROKER_HOST, port=BROKER_PORT, authkey=None):
+    """
+    Expose a SweepBroker over TCP so workers on other machines can use it.
+    Binds to localhost unless another host is given. Blocks until interrupted.
+    """
+    authkey = resolve_authkey(authkey)
+    broker = SweepBroker(db_path)
+    _BrokerManager.register("get_broker", callable=lambda: broker)
+    manager = _BrokerManager(address=(host, port), authkey=authkey)
+    server = manager.get_server()
+    print(f"📡 Sweep broker listening on {host}:{port} (db: {db_path})")
+    server.serve_forever()
+
+
+def connect_broker(host=BROKER_HOST, port=BROKER_PORT, authkey=None):
+    """
+    Connect to a broker started with serve_broker(). The returned proxy
+    has the same methods as SweepBroker.
+    """
+    authkey = resolve_authkey(authkey)
+    _BrokerManager.register("get_broker")
+    manager = _BrokerManager(address=(host, port), authkey=authkey)
+    manager.connect()
+    return manager.get_broker()
+
+
+# ----------------------------
+# 🛠️ Worker
+# ----------------------------
+def load_symbol_data(symbol, days=30):
+    """
+    Load cleaned OHLC data for a symbol from data/<symbol>_cleaned.csv,
+    fetching and caching it from CoinGecko on first use.
+    """
+    data_path = f"data/{symbol}_cleaned.csv"
+    if os.path.exists(data_path):
+        return pd.read_csv(data_path, parse_dates=["timestamp"])
+    df = fetch_ohlcv(symbol, days)
+    return clean_and_prepare_data(df, save_path=data_path)
+
+
+def run_job(job, data_cache=None):
+    """
+    Backtest every parameter combination in a job and compute its metrics.
+    """
+    registry = _strategy_registry()
+    if job["strategy"] not in registry:
+        raise ValueError(f"❌ Unknown strategy: {job['strategy']}")
+    generate_signals, crossover_map = registry[job["strategy"]]
+
+    if data_cache is None:
+        data_cache = {}
+    if job["symbol"] not in data_cache:
+        data_cache[job["symbol"]] = load_symbol_data(job["symbol"])
+    base_df = data_cache[job["symbol"]]
+
+    results = []
+    for params in job["params"]:
+        df = generate_signals(base_df.copy(), **params, save_path=None)
+        if crossover_map:
+            df["crossover"] = df["crossover"].map(crossover_map).fillna(0)
+        final_balance, trades_df, equity_df = backtest_strategy(df)
+        results.append({
+            "params": params,
+            "final_balance": float(final_balance),
+            "metrics": calculate_performance_metrics(trades_df, equity_df),
+        })
+    return results
+
+
+def run_worker(broker, worker_id=None, max_jobs=None, exit_when_empty=True):
+    """
+    Pull jobs from the broker until the queue is drained (or max_jobs is hit).
+    broker can be a local SweepBroker or a proxy from connect_broker().
+    Returns the number of jobs completed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    data_cache = {}
+    completed = 0
+
+    print(f"👷 Worker {worker_id} started")
+    while max_jobs is None or completed < max_jobs:
+        job = broker.claim(worker_id)
+        if job is None:
+            if exit_when_empty and broker.is_finished():
+                break
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        try:
+            results = run_job(job, data_cache)
+        except Exception as e:
+            print(f"⚠️ Job {job['job_id'][:8]} failed (attempt {job['attempt']}): {e}")
+            broker.fail(job["job_id"], worker_id, repr(e))
+            continue
+
+        if not broker.complete(job["job_id"], worker_id, results):
+            print(f"⚠️ Job {job['job_id'][:8]} lease lost before completion — results dropped")
+            continue
+        completed += 1
+        print(f"✅ Job {job['job_id'][:8]} done: {job['strategy']} on {job['symbol']} ({len(results)} runs)")
+
+    print(f"🏁 Worker {worker_id} finished after {completed} jobs")
+    return completed
+
+
+# ----------------------------
+# 🚀 Main
+# ----------------------------
+DEFAULT_PARAM_GRIDS = {
+    "ema": {"fast_window": [3, 5, 8, 12], "slow_window": [20, 26, 34, 50]},
+    "ema_rsi": {"fast_window": [3, 5, 8], "slow_window": [20, 26, 34], "rsi_period": [7, 10, 14]},
+    "macd": {"short": [8, 12, 16], "long": [21, 26, 34], "signal": [5, 9, 12]},
+}
+
+SELFTEST_PARAM_GRIDS = {
+    "ema": {"fast_window": [5, 8], "slow_window": [20, 26]},
+    "ema_rsi": {"fast_window": [5], "slow_window": [20], "rsi_period": [7, 10]},
+    "macd": {"short": [12], "long": [26], "signal": [9]},
+}
+
+
+def _selftest_worker(db_path):
+    return run_worker(SweepBroker(db_path, lease_seconds=1))
+
+
+def selftest(n_workers=4):
+    """
+    End-to-end check on a temp queue: several worker processes drain it,
+    a job abandoned mid-lease is re-run after the lease expires, re-publishing
+    adds nothing, and a stale worker cannot complete a job it no longer holds.
+    Returns True if every check passed.
+    """
+    checks = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "selftest_queue.db")
+        broker = SweepBroker(db_path, lease_seconds=1)
+        strategies = list(SELFTEST_PARAM_GRIDS)
+        n_runs = sum(len(expand_param_grid(g)) for g in SELFTEST_PARAM_GRIDS.values())
+
+        n_jobs = broker.publish(strategies, SELFTEST_PARAM_GRIDS, ["bitcoin"], chunk_size=2)
+        checks.append(("re-publish queues no duplicates",
+                       broker.publish(strategies, SELFTEST_PARAM_GRIDS, ["bitcoin"], chunk_size=2) == 0))
+
+        # A worker that claims a job and dies without reporting back
+        abandoned = broker.claim("ghost-worker")
+
+        with multiprocessing.Pool(n_workers) as pool:
+            completed = pool.map(_selftest_worker, [db_path] * n_workers)
+
+        checks.append(("every job done", broker.status() == {"done": n_jobs}))
+        checks.append(("each job completed exactly once", sum(completed) == n_jobs))
+        checks.append(("abandoned job re-run after lease expiry",
+                       broker.claim("late-worker") is None and broker.status().get("done") == n_jobs))
+        checks.append(("stale worker cannot complete a lost lease",
+                       broker.complete(abandoned["job_id"], "ghost-worker", []) is False))
+
+        results = broker.fetch_results()
+        checks.append(("one result per parameter combination", len(results) == n_runs))
+        checks.append(("results unique", len({(r["strategy"], json.dumps(r["params"], sort_keys=True)) for r in results}) == n_runs))
+
+    print("\n🧪 SWEEP SELFTEST")
+    print("────────────────────────────")
+    for name, passed in checks:
+        print(f"{'✅' if passed else '❌'} {name}")
+    print("────────────────────────────\n")
+    return all(passed for _, passed in checks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed parameter sweep over a work-queue broker")
+    parser.add_argument("mode", choices=["publish", "serve", "worker", "status", "results", "selftest"])
+    parser.add_argument("--db", default=DB_PATH, help="SQLite queue file")
+    parser.add_argument("--host", default=None, help="broker host (worker) or bind address (serve, default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=BROKER_PORT)
+    parser.add_argument("--authkey", default=None, help=f"broker authkey (or set {AUTHKEY_ENV})")
+    parser.add_argument("--workers", type=int, default=4, help="worker processes for selftest")
+    parser.add_argument("--strategies", nargs="+", default=list(DEFAULT_PARAM_GRIDS))
+    parser.add_argument("--symbols", nargs="+", default=["bitcoin"])
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--keep-alive", action="store_true", help="worker keeps polling when the queue is empty")
+    args = parser.parse_args()
+
+    if args.mode == "selftest":
+        sys.exit(0 if selftest(args.workers) else 1)
+
+    try:
+        if args.mode == "serve":
+            serve_broker(args.db, host=args.host or BROKER_HOST, port=args.port, authkey=args.authkey)
+            sys.exit(0)
+
+        # Workers given --host talk to a remote broker; otherwise share the local SQLite file
+        broker = connect_broker(args.host, args.port, args.authkey) if args.host else SweepBroker(args.db)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    if args.mode == "publish":
+        queued = broker.publish(args.strategies, DEFAULT_PARAM_GRIDS, args.symbols, args.chunk_size)
+        print(f"📤 Queued {queued} new jobs")
+    elif args.mode == "worker":
+        run_worker(broker, exit_when_empty=not args.keep_alive)
+    elif args.mode == "status":
+        print(f"📋 Queue status: {broker.status()}")
+    else:
+        df = results_to_dataframe(broker.fetch_results())
+        out_path = "data/sweep_results.csv"
+        df.to_csv(out_path, index=False)
+        print(f"💾 {len(df)} results saved → {out_path}")
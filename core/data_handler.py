@@ -26,9 +26,10 @@ def fetch_ohlcv(symbol_id="bitcoin", days=30):
     return df
 
 
-def clean_and_prepare_data(df):
+def clean_and_prepare_data(df, save_path="data/bitcoin_cleaned.csv"):
     """
     Clean the OHLCV data and prepare it for strategy use.
+    save_path: where the cleaned CSV is cached (None to skip saving)
     """
     print("🧹 Cleaning and preparing data...")
 
@@ -49,8 +50,9 @@ def clean_and_prepare_data(df):
     print(f"✅ Data cleaned. Final shape: {df.shape}")
 
     # Save cleaned data
-    df.to_csv("data/bitcoin_cleaned.csv", index=False)
-    print("💾 Cleaned data saved to data/bitcoin_cleaned.csv")
+    if save_path:
+        df.to_csv(save_path, index=False)
+        print(f"💾 Cleaned data saved to {save_path}")
 
     return df
 
@@ -5,13 +5,14 @@ import sys
 import time
 import random
 import requests
+import numpy as np
 import pandas as pd
+from collections import deque
 from datetime import datetime
 
 # ✅ Add project root to import path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from strategies.ema_crossover import generate_ema_signals
 from core.data_handler import clean_and_prepare_data, fetch_ohlcv
 
 # === Configuration ===
@@ -19,6 +20,7 @@ SYMBOL_ID = "bitcoin"
 INTERVAL = 20          # seconds between price checks
 START_BALANCE = 1000
 MAX_RETRIES = 3
+WINDOW = 50            # rolling bars the EMA signals are computed over
 
 
 def load_or_fetch_data():
@@ -72,14 +74,88 @@ def get_latest_price(symbol_id="bitcoin"):
         return None
 
 
+class EmaCrossoverTrader:
+    """
+    Tick-by-tick EMA crossover decision logic shared by live and replay trading.
+
+    Keeps the last `window` closes and reproduces what generate_ema_signals
+    would return for them (EMA with adjust=False, seeded at the window start),
+    but only evaluates the last two bars, so each tick costs a few dot products
+    instead of rebuilding a DataFrame.
+    """
+
+    def __init__(self, history=(), balance=START_BALANCE, fast_window=5, slow_window=20, window=WINDOW):
+        self.window = window
+        self.fast_window = fast_window
+        self.slow_window = slow_window
+        self.closes = deque((float(p) for p in history), maxlen=window)
+        self.balance = balance
+        self.position = 0
+        self.entry_price = 0
+        self.trade_log = []
+        self._fast_weights = self._ema_weights(fast_window, window)
+        self._slow_weights = self._ema_weights(slow_window, window)
+
+    @staticmethod
+    def _ema_weights(span, window):
+        """
+        weights[n] dotted with n closes gives the last value of
+        ewm(span, adjust=False).mean() over those closes.
+        """
+        alpha = 2 / (span + 1)
+        weights = [None]
+        for n in range(1, window + 1):
+            w = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1)
+            w[0] = (1 - alpha) ** (n - 1)
+            weights.append(w)
+        return weights
+
+    def _signal(self, closes):
+        n = len(closes)
+        diff = self._fast_weights[n] @ closes - self._slow_weights[n] @ closes
+        return 1 if diff > 0 else (-1 if diff < 0 else 0)
+
+    def on_tick(self, timestamp, price):
+        """
+        Feed one price. Returns (signal, trade) where trade is the logged
+        BUY/SELL dict, or None if nothing was executed.
+        """
+        self.closes.append(float(price))
+        closes = np.fromiter(self.closes, dtype=float, count=len(self.closes))
+        signal = self._signal(closes)
+        if len(closes) < 2:
+            return signal, None
+        crossover = signal - self._signal(closes[:-1])
+
+        trade = None
+        if crossover == 2 and self.position == 0:
+            self.position = 1
+            self.entry_price = price
+            trade = {"timestamp": timestamp, "action": "BUY", "price": price}
+
+        elif crossover == -2 and self.position == 1:
+            self.position = 0
+            profit = (price - self.entry_price) / self.entry_price * 100
+            self.balance *= (1 + profit / 100)
+            trade = {
+                "timestamp": timestamp,
+                "action": "SELL",
+                "price": price,
+                "profit_%": profit,
+                "balance": self.balance
+            }
+
+        if trade:
+            self.trade_log.append(trade)
+        return signal, trade
+
+
 def paper_trade(df, balance=START_BALANCE):
     """
     Run EMA crossover strategy in a live-like loop using new data points.
     Simulates buy/sell trades and logs results.
     """
-    position = 0
-    entry_price = 0
-    trade_log = []
+    trader = EmaCrossoverTrader(df["close"], balance)
 
     print(f"🚀 Starting Paper Trading for {SYMBOL_ID.upper()}")
     print(f"💰 Starting balance: ${balance}")
@@ -93,45 +169,22 @@ def paper_trade(df, balance=START_BALANCE):
                 continue
 
             timestamp = datetime.utcnow()
-
-            # Add new tick to dataframe
-            new_row = {"timestamp": timestamp, "close": latest_price}
-            df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-            df = df.tail(50).reset_index(drop=True)
-
-            # Recalculate EMA signals
-            df = generate_ema_signals(df, fast_window=5, slow_window=20)
-            signal = int(df["signal"].iloc[-1])
-            crossover = df["crossover"].iloc[-1]
+            signal, trade = trader.on_tick(timestamp, latest_price)
 
             print(f"[{timestamp:%H:%M:%S}] Price: ${latest_price:.2f} | Signal: {signal}")
 
-            # Simulated trading logic
-            if crossover == 2 and position == 0:
-                position = 1
-                entry_price = latest_price
-                print(f"🟢 BUY executed at ${entry_price:.2f}")
-                trade_log.append({"timestamp": timestamp, "action": "BUY", "price": entry_price})
-
-            elif crossover == -2 and position == 1:
-                position = 0
-                profit = (latest_price - entry_price) / entry_price * 100
-                balance *= (1 + profit / 100)
-                print(f"🔴 SELL executed at ${latest_price:.2f} | Profit: {profit:.2f}% | Balance: ${balance:.2f}")
-                trade_log.append({
-                    "timestamp": timestamp,
-                    "action": "SELL",
-                    "price": latest_price,
-                    "profit_%": profit,
-                    "balance": balance
-                })
-                pd.DataFrame(trade_log).to_csv("data/paper_trades.csv", index=False)
+            if trade and trade["action"] == "BUY":
+                print(f"🟢 BUY executed at ${trade['price']:.2f}")
+
+            elif trade and trade["action"] == "SELL":
+                print(f"🔴 SELL executed at ${latest_price:.2f} | Profit: {trade['profit_%']:.2f}% | Balance: ${trader.balance:.2f}")
+                pd.DataFrame(trader.trade_log).to_csv("data/paper_trades.csv", index=False)
 
             time.sleep(INTERVAL)
 
         except KeyboardInterrupt:
             print("\n🛑 Paper trading stopped manually.")
-            pd.DataFrame(trade_log).to_csv("data/paper_trades.csv", index=False)
+            pd.DataFrame(trader.trade_log).to_csv("data/paper_trades.csv", index=False)
             print("💾 Trades saved to data/paper_trades.csv")
             break
 
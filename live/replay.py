@@ -0,0 +1,199 @@
+# live/replay.py
+
+import io
+import os
+import sys
+import time
+import argparse
+import contextlib
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+# ✅ Add project root to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from live.paper_trader import EmaCrossoverTrader, load_or_fetch_data, INTERVAL, START_BALANCE, WINDOW
+from strategies.ema_crossover import generate_ema_signals
+
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class VirtualClock:
+    """
+    Stand-in for wall-clock time during replay: sleeping just moves the
+    clock forward, so a 20 s tick interval costs nothing.
+    """
+
+    def __init__(self, start=None):
+        self.current = start or datetime(2025, 1, 1)
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.current += timedelta(seconds=seconds)
+
+
+def load_ticks(path):
+    """
+    Load recorded ticks or bars from CSV. Uses the 'price' column if present,
+    otherwise 'close'. Returns (timestamps, prices) arrays in time order.
+    """
+    df = pd.read_csv(path)
+    price_col = "price" if "price" in df.columns else "close"
+    if price_col not in df.columns:
+        raise ValueError(f"❌ {path} must include a 'price' or 'close' column.")
+    df = df.dropna(subset=[price_col])
+    if "timestamp" in df.columns:
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        df = df.sort_values("timestamp", kind="mergesort")
+        timestamps = df["timestamp"].to_numpy()
+    else:
+        timestamps = None
+    return timestamps, df[price_col].to_numpy(dtype=float)
+
+
+def synthetic_ticks(n_ticks, start_price=100_000.0, volatility=0.002, seed=42):
+    """
+    Seeded geometric random walk, so the same seed always gives the same stream.
+    """
+    rng = np.random.default_rng(seed)
+    return start_price * np.cumprod(1 + rng.normal(0, volatility, n_ticks))
+
+
+def replay(prices, timestamps=None, history=(), balance=START_BALANCE, interval=INTERVAL, clock=None):
+    """
+    Push a price stream through the live EMA crossover decision path as fast
+    as possible. Without recorded timestamps, a VirtualClock advances by
+    `interval` seconds per tick, mimicking the live loop's sleep.
+
+    Returns (trader, stats) where stats holds throughput and per-tick
+    latency percentiles in microseconds.
+    """
+    trader = EmaCrossoverTrader(history, balance)
+    clock = clock or VirtualClock()
+    n_ticks = len(prices)
+    latencies = np.empty(n_ticks, dtype=np.int64)
+    perf_counter_ns = time.perf_counter_ns
+    on_tick = trader.on_tick
+
+    started = perf_counter_ns()
+    for i in range(n_ticks):
+        timestamp = timestamps[i] if timestamps is not None else clock.now()
+        t0 = perf_counter_ns()
+        on_tick(timestamp, prices[i])
+        latencies[i] = perf_counter_ns() - t0
+        if timestamps is None:
+            clock.sleep(interval)
+    elapsed = (perf_counter_ns() - started) / 1e9
+
+    stats = {
+        "ticks": n_ticks,
+        "elapsed_s": round(elapsed, 3),
+        "ticks_per_s": round(n_ticks / elapsed, 1) if elapsed > 0 else np.inf,
+        "trades": len(trader.trade_log),
+        "final_balance": round(trader.balance, 2),
+    }
+    if n_ticks:
+        for pct, value in zip(LATENCY_PERCENTILES, np.percentile(latencies, LATENCY_PERCENTILES)):
+            stats[f"latency_p{pct}_us"] = round(value / 1000, 2)
+        stats["latency_max_us"] = round(latencies.max() / 1000, 2)
+    return trader, stats
+
+
+def verify_against_strategy(prices, history=(), balance=START_BALANCE):
+    """
+    Replay prices through both EmaCrossoverTrader and the original pandas
+    path (rolling window + generate_ema_signals) and compare every tick's
+    signal and every trade. Keeps the live trader from silently drifting
+    away from strategies/ema_crossover.py.
+    Returns (ok, mismatches) where mismatches lists the first differences.
+    """
+    trader = EmaCrossoverTrader(history, balance)
+    df = pd.DataFrame({"close": np.asarray(history, dtype=float)})
+    position = 0
+    mismatches = []
+
+    for i, price in enumerate(prices):
+        signal, trade = trader.on_tick(i, price)
+
+        df = pd.concat([df, pd.DataFrame([{"close": price}])], ignore_index=True)
+        df = df.tail(trader.window).reset_index(drop=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            df = generate_ema_signals(df, trader.fast_window, trader.slow_window, save_path=None)
+        ref_signal = int(df["signal"].iloc[-1])
+        crossover = df["crossover"].iloc[-1]
+
+        ref_trade = None
+        if crossover == 2 and position == 0:
+            position = 1
+            ref_trade = "BUY"
+        elif crossover == -2 and position == 1:
+            position = 0
+            ref_trade = "SELL"
+
+        if signal != ref_signal or (trade["action"] if trade else None) != ref_trade:
+            mismatches.append({"tick": i, "signal": signal, "ref_signal": ref_signal,
+                               "trade": trade["action"] if trade else None, "ref_trade": ref_trade})
+            if len(mismatches) >= 10:
+                break
+
+    return not mismatches, mismatches
+
+
+def print_replay_report(stats):
+    """
+    Nicely format replay stats for terminal output.
+    """
+    print("\n⏩ REPLAY REPORT")
+    print("────────────────────────────")
+    for k, v in stats.items():
+        print(f"{k:<20} : {v}")
+    print("────────────────────────────\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded or synthetic ticks through the paper trader")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--file", help="CSV with a timestamp column and a price or close column")
+    source.add_argument("--synthetic", type=int, metavar="N", help="replay N seeded random-walk ticks")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-history", action="store_true", help="start with an empty EMA window")
+    parser.add_argument("--output", default="data/paper_trades_replay.csv")
+    parser.add_argument("--verify", action="store_true",
+                        help="check the trader against generate_ema_signals on the stream before replaying")
+    parser.add_argument("--verify-ticks", type=int, default=2000, help="ticks to check with --verify")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        # Synthetic walks continue from the latest cached close
+        history = () if args.no_history else load_or_fetch_data()["close"].to_numpy()
+        start_price = history[-1] if len(history) else 100_000.0
+        timestamps, prices = None, synthetic_ticks(args.synthetic, start_price=start_price, seed=args.seed)
+        print(f"🎲 Replaying {args.synthetic} synthetic ticks (seed={args.seed})")
+    else:
+        path = args.file or "data/bitcoin_cleaned.csv"
+        timestamps, prices = load_ticks(path)
+        if args.no_history:
+            history = ()
+        else:
+            # Warm the EMA window with the file's own leading bars
+            history, prices = prices[:WINDOW], prices[WINDOW:]
+            timestamps = timestamps[WINDOW:] if timestamps is not None else None
+        print(f"📼 Replaying {len(prices)} ticks from {path} ({len(history)} warm-up bars)")
+
+    if args.verify:
+        ok, mismatches = verify_against_strategy(prices[:args.verify_ticks], history)
+        if not ok:
+            print("❌ EmaCrossoverTrader disagrees with generate_ema_signals:")
+            for m in mismatches:
+                print(f"   {m}")
+            sys.exit(1)
+        print(f"✅ Verified {min(len(prices), args.verify_ticks)} ticks against generate_ema_signals")
+
+    trader, stats = replay(prices, timestamps, history=history)
+    print_replay_report(stats)
+
+    pd.DataFrame(trader.trade_log, columns=["timestamp", "action", "price", "profit_%", "balance"]).to_csv(args.output, index=False)
+    print(f"💾 Trades saved to {args.output}")
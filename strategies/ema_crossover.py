@@ -10,10 +10,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.data_handler import clean_and_prepare_data, fetch_ohlcv
 
 
-def generate_ema_signals(df, fast_window=5, slow_window=20):
+def generate_ema_signals(df, fast_window=5, slow_window=20, save_path="data/strategy_ema_signals.csv"):
     """
     Generate buy/sell signals based on EMA crossover strategy.
     Buy when EMA_fast > EMA_slow, Sell when EMA_fast < EMA_slow.
+    save_path: where the signals CSV is written (None to skip saving)
     """
     print("⚙️ Generating EMA crossover signals...")
 
@@ -29,8 +30,9 @@ def generate_ema_signals(df, fast_window=5, slow_window=20):
     df["crossover"] = df["signal"].diff()
 
     # Save results
-    df.to_csv("data/strategy_ema_signals.csv", index=False)
-    print("✅ Signals generated and saved to data/strategy_ema_signals.csv")
+    if save_path:
+        df.to_csv(save_path, index=False)
+        print(f"✅ Signals generated and saved to {save_path}")
 
     return df
 
@@ -3,7 +3,8 @@ import pandas as pd
 import numpy as np
 
 
-def generate_ema_rsi_signals(df, fast_window=5, slow_window=20, rsi_period=10):
+def generate_ema_rsi_signals(df, fast_window=5, slow_window=20, rsi_period=10,
+                             save_path="data/strategy_ema_rsi_signals.csv"):
     """
     EMA + RSI hybrid trading strategy.
 
@@ -16,6 +17,8 @@ def generate_ema_rsi_signals(df, fast_window=5, slow_window=20, rsi_period=10):
 
     The goal of these parameters is to ensure
     enough crossovers happen for testing.
+
+    save_path: where the signals CSV is written (None to skip saving)
     """
 
     print("⚙️ Generating EMA + RSI strategy signals...")
@@ -52,7 +55,8 @@ def generate_ema_rsi_signals(df, fast_window=5, slow_window=20, rsi_period=10):
         print("⚠️ Warning: No valid trade signals detected. Try adjusting RSI or EMA parameters.")
 
     # Save for manual inspection
-    df.to_csv("data/strategy_ema_rsi_signals.csv", index=False)
-    print("✅ Signals saved → data/strategy_ema_rsi_signals.csv")
+    if save_path:
+        df.to_csv(save_path, index=False)
+        print(f"✅ Signals saved → {save_path}")
 
     return df
@@ -1,10 +1,11 @@
 # strategies/macd_strategy.py
 import pandas as pd
 
-def generate_macd_signals(df, short=12, long=26, signal=9):
+def generate_macd_signals(df, short=12, long=26, signal=9, save_path="data/strategy_macd_signals.csv"):
     """
     Compute MACD line, signal line, histogram, and buy/sell signals.
     Returns DataFrame with 'crossover' column like other strategies.
+    save_path: where the signals CSV is written (None to skip saving)
     """
     df = df.copy()
     df["ema_short"] = df["close"].ewm(span=short, adjust=False).mean()
@@ -17,5 +18,6 @@ def generate_macd_signals(df, short=12, long=26, signal=9):
     df.loc[(df["macd"] > df["signal_line"]) & (df["macd"].shift(1) <= df["signal_line"].shift(1)), "crossover"] = 2  # Buy
     df.loc[(df["macd"] < df["signal_line"]) & (df["macd"].shift(1) >= df["signal_line"].shift(1)), "crossover"] = -2  # Sell
 
-    df.to_csv("data/strategy_macd_signals.csv", index=False)
+    if save_path:
+        df.to_csv(save_path, index=False)
     return df
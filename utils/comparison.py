@@ -1,26 +1,265 @@
 # utils/comparison.py
+import os
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
-from utils.analytics import calculate_performance_metrics
-
-def compare_strategies():
-    strategies = {
-        "EMA + RSI": {
-            "trades": "data/backtest_trades_ema_rsi.csv",
-            "equity": "data/equity_curve_ema_rsi.csv"
-        },
-        "MACD": {
-            "trades": "data/backtest_trades_macd.csv",
-            "equity": "data/equity_curve_macd.csv"
-        }
+
+DEFAULT_STRATEGIES = {
+    "EMA + RSI": {
+        "trades": "data/backtest_trades_ema_rsi.csv",
+        "equity": "data/equity_curve_ema_rsi.csv"
+    },
+    "MACD": {
+        "trades": "data/backtest_trades_macd.csv",
+        "equity": "data/equity_curve_macd.csv"
     }
+}
+
 
-    results = {}
+@lru_cache(maxsize=256)
+def _read_equity_csv(path, mtime):
+    """
+    Cached equity curve read; mtime is part of the key so edited files are re-read.
+    Callers must copy before modifying (load_equity_curves does).
+    """
+    return pd.read_csv(path, parse_dates=["timestamp"])
+
+
+def load_equity_curves(strategies=None):
+    """
+    Load equity curves for {name: {"equity": path, ...}}.
+    Strategies without a usable equity file are skipped with a warning.
+    """
+    strategies = strategies or DEFAULT_STRATEGIES
+    curves = {}
     for name, paths in strategies.items():
+        path = paths["equity"]
+        if not os.path.exists(path):
+            print(f"⚠️ Skipping {name}: {path} not found. Run the backtester first.")
+            continue
         try:
-            trades_df = pd.read_csv(paths["trades"])
-            equity_df = pd.read_csv(paths["equity"])
-            if not trades_df.empty and not equity_df.empty:
-                results[name] = calculate_performance_metrics(trades_df, equity_df)
-        except Exception:
+            equity_df = _read_equity_csv(path, os.path.getmtime(path))
+        except pd.errors.EmptyDataError:
+            print(f"⚠️ Skipping {name}: {path} is empty.")
+            continue
+        if equity_df.empty:
+            print(f"⚠️ Skipping {name}: {path} has no rows.")
+            continue
+        curves[name] = equity_df.copy()
+    return curves
+
+
+def load_trade_counts(strategies=None):
+    """
+    Closed-trade counts from each strategy's trades CSV (rows with a profit),
+    for strategies that have one. Feeds rank_strategies(trade_counts=...).
+    """
+    strategies = strategies or DEFAULT_STRATEGIES
+    counts = {}
+    for name, paths in strategies.items():
+        path = paths.get("trades")
+        if not path or not os.path.exists(path):
             continue
-    return results
+        try:
+            trades_df = pd.read_csv(path)
+        except pd.errors.EmptyDataError:
+            counts[name] = 0
+            continue
+        counts[name] = int(trades_df["profit_$"].notna().sum()) if "profit_$" in trades_df.columns else 0
+    return counts
+
+
+def align_equity_curves(curves):
+    """
+    Align equity curves on a shared timestamp index.
+
+    curves: {name: DataFrame with timestamp/balance, or Series indexed by time},
+    or an already aligned wide DataFrame (one column per strategy).
+    Returns a (timestamps x strategies) DataFrame. Timestamps a curve has
+    no row for stay NaN, so metrics only ever see that curve's own points.
+    """
+    if isinstance(curves, pd.DataFrame):
+        wide = curves.sort_index()
+    else:
+        series = {}
+        for name, curve in curves.items():
+            if isinstance(curve, pd.DataFrame):
+                curve = curve.drop_duplicates(subset="timestamp", keep="last").set_index("timestamp")["balance"]
+            series[name] = curve
+        if not series:
+            return pd.DataFrame()
+        wide = pd.concat(series, axis=1).sort_index()
+    return wide.astype(float)
+
+
+# ----------------------------
+# 📐 Batched Metrics
+# ----------------------------
+def _safe_divide(num, den, fill=np.nan):
+    out = np.full(np.broadcast(num, den).shape, fill, dtype=float)
+    np.divide(num, den, out=out, where=(den != 0) & ~np.isnan(den))
+    return out
+
+
+def _ffill_within_span(equity):
+    """
+    Forward-fill each column between its first and last observation;
+    rows outside that span stay NaN.
+    """
+    observed = ~np.isnan(equity)
+    rows = np.arange(len(equity))[:, None]
+    last_seen = np.maximum.accumulate(np.where(observed, rows, 0), axis=0)
+    filled = np.take_along_axis(equity, last_seen, axis=0)
+    last_row = len(equity) - 1 - np.argmax(observed[::-1], axis=0)
+    filled[rows > last_row] = np.nan
+    return filled
+
+
+def _period_returns(equity):
+    """
+    Per-column returns between consecutive observations of that column.
+    Returns (pnl, returns, mask); mask is False where a column has no
+    observation at that row, and pnl/returns are 0/NaN there.
+    """
+    filled = _ffill_within_span(equity)
+    mask = ~np.isnan(equity[1:]) & ~np.isnan(filled[:-1])
+    pnl = np.where(mask, np.diff(filled, axis=0), 0.0)
+    returns = np.where(mask, _safe_divide(pnl, filled[:-1], fill=0.0), np.nan)
+    return pnl, returns, mask
+
+
+def batch_performance_metrics(equity, risk_free_rate=0.0, periods_per_year=252, trade_counts=None):
+    """
+    Compute performance metrics for every column of a 2-D equity array at once.
+
+    equity: array of shape (timestamps, strategies); NaN where a strategy has
+    no data, so each column is measured only over its own observations.
+    trade_counts: optional closed-trade count per column.
+    Trade statistics are derived from balance changes, since the backtester
+    only moves the balance when a trade closes. A breakeven trade leaves the
+    balance unchanged and is invisible in the curve, so without trade_counts
+    it is missing from total_trades, win_rate_% and avg_RR. With
+    trade_counts, the unseen trades are counted as zero-profit losses, as
+    calculate_performance_metrics does (profit <= 0 is a loss). Sharpe uses
+    the same annualisation as calculate_performance_metrics.
+    Returns a dict of 1-D arrays, one value per strategy.
+    """
+    equity = np.asarray(equity, dtype=float)
+    if equity.ndim == 1:
+        equity = equity[:, None]
+
+    pnl, returns, mask = _period_returns(equity)
+
+    # Trade stats
+    wins = pnl > 0
+    losses = pnl < 0
+    n_wins = wins.sum(axis=0)
+    n_losses = losses.sum(axis=0)
+    if trade_counts is not None:
+        # Breakeven trades: closed but invisible in the balance
+        n_losses = n_losses + np.maximum(np.asarray(trade_counts, dtype=int) - n_wins - n_losses, 0)
+    total_trades = n_wins + n_losses
+    gross_profit = np.where(wins, pnl, 0.0).sum(axis=0)
+    gross_loss = -np.where(losses, pnl, 0.0).sum(axis=0)
+    win_rate = _safe_divide(n_wins, total_trades, fill=0.0) * 100
+    profit_factor = np.where(gross_loss > 0, _safe_divide(gross_profit, gross_loss), np.inf)
+    avg_win = _safe_divide(gross_profit, n_wins, fill=0.0)
+    avg_loss = _safe_divide(gross_loss, n_losses, fill=0.0)
+    avg_rr = _safe_divide(avg_win, avg_loss)
+
+    # Max drawdown (NaN rows never raise the running high or count as drawdown)
+    high = np.fmax.accumulate(equity, axis=0)
+    drawdown = np.where(np.isnan(equity), 0.0, _safe_divide(equity - high, high, fill=0.0))
+    max_dd = np.abs(drawdown.min(axis=0)) * 100
+
+    # Sharpe ratio over each column's own returns (population std, like np.std)
+    n_returns = mask.sum(axis=0)
+    mean = _safe_divide(np.where(mask, returns, 0.0).sum(axis=0), n_returns, fill=0.0)
+    var = _safe_divide((np.where(mask, returns - mean, 0.0) ** 2).sum(axis=0), n_returns, fill=0.0)
+    sharpe = _safe_divide(mean - risk_free_rate, np.sqrt(var), fill=0.0) * np.sqrt(periods_per_year)
+
+    observed = ~np.isnan(equity)
+    first = np.take_along_axis(equity, np.argmax(observed, axis=0)[None, :], axis=0)[0]
+    last = np.take_along_axis(equity, (len(equity) - 1 - np.argmax(observed[::-1], axis=0))[None, :], axis=0)[0]
+    total_return = _safe_divide(last - first, first, fill=0.0) * 100
+
+    return {
+        "total_trades": total_trades,
+        "win_rate_%": win_rate,
+        "profit_factor": profit_factor,
+        "avg_RR": avg_rr,
+        "max_drawdown_%": max_dd,
+        "sharpe_ratio": sharpe,
+        "total_return_%": total_return,
+    }
+
+
+def correlation_matrix(aligned):
+    """
+    Pairwise correlation of per-period returns between strategies.
+    Returns are taken over the same intervals for every curve (consecutive
+    rows of the shared index, forward-filled within each curve's span), and
+    a pair only uses intervals inside both spans. Strategies that never
+    change balance get NaN correlations.
+    """
+    filled = _ffill_within_span(aligned.to_numpy(dtype=float))
+    returns = _safe_divide(np.diff(filled, axis=0), filled[:-1])
+    return pd.DataFrame(returns, columns=aligned.columns).corr()
+
+
+def rolling_relative_performance(aligned, window=20):
+    """
+    Each strategy's return over a rolling window minus the mean of the
+    strategies that have data for the same window. Positive values mean
+    it is outperforming the field.
+    """
+    filled = _ffill_within_span(aligned.to_numpy(dtype=float))
+    rel = np.full_like(filled, np.nan)
+    if len(filled) > window:
+        window_return = _safe_divide(filled[window:], filled[:-window]) - 1
+        valid = ~np.isnan(window_return)
+        field = _safe_divide(np.where(valid, window_return, 0.0).sum(axis=1, keepdims=True),
+                             valid.sum(axis=1, keepdims=True))
+        rel[window:] = window_return - field
+    return pd.DataFrame(rel, index=aligned.index, columns=aligned.columns)
+
+
+def rank_strategies(curves, by="sharpe_ratio", ascending=False, risk_free_rate=0.0, trade_counts=None):
+    """
+    Align any number of equity curves and rank them by a metric in one pass.
+    Ranking uses the unrounded metrics; only the returned table is rounded.
+    Strategies that never traded, then those with a NaN metric, are ranked last.
+    trade_counts: optional {name: closed trades}, see batch_performance_metrics.
+    Returns a DataFrame indexed by strategy name with a 1-based 'rank' column.
+    """
+    aligned = align_equity_curves(curves)
+    if aligned.empty:
+        return pd.DataFrame()
+    if trade_counts is not None:
+        trade_counts = [trade_counts.get(name, 0) for name in aligned.columns]
+    metrics = batch_performance_metrics(aligned.to_numpy(), risk_free_rate=risk_free_rate,
+                                        trade_counts=trade_counts)
+
+    values = np.asarray(metrics[by], dtype=float)
+    key = values if ascending else -values
+    order = np.lexsort((np.where(np.isnan(key), np.inf, key), np.isnan(key), metrics["total_trades"] == 0))
+
+    table = pd.DataFrame(metrics, index=aligned.columns).iloc[order].round(2)
+    table["total_trades"] = table["total_trades"].astype(int)
+    table.insert(0, "rank", np.arange(1, len(table) + 1))
+    return table
+
+
+def compare_strategies(strategies=None):
+    """
+    Compare backtested strategies from their saved equity curves.
+    Strategies without trades are left out, as before.
+    Returns {name: metrics dict}, like calculate_performance_metrics per strategy.
+    """
+    curves = load_equity_curves(strategies)
+    table = rank_strategies(curves, trade_counts=load_trade_counts(strategies))
+    if table.empty:
+        return {}
+    table = table[table["total_trades"] > 0]
+    return table.drop(columns="rank").to_dict(orient="index")